@@ -1,16 +1,42 @@
+import hashlib
+import json
 import random
-from dataclasses import dataclass, asdict
+import unicodedata
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from operator import itemgetter
 from pathlib import Path
-from typing import List
+from typing import Iterator, List, Sequence, Tuple
 
 import streamlit as st
-from openpyxl import load_workbook
 
 XLSX_PATH = Path("quiz.xlsx")
 QUESTIONS_PER_RUN = 10
-
-
-@dataclass
+BLANK = "____"
+
+# 全角アンダースコア（＿）を半角に揃える
+FULLWIDTH_UNDERSCORE = str.maketrans({"＿": "_"})
+
+# NFKC で揃わない記号の置き換えと、ゼロ幅文字の除去
+PUNCT_TABLE = str.maketrans(
+    {
+        "‘": "'",
+        "’": "'",
+        "“": '"',
+        "”": '"',
+        "–": "-",
+        "—": "-",
+        "\u200b": None,
+        "\u200c": None,
+        "\u200d": None,
+        "\ufeff": None,
+    }
+)
+
+
+# 全セッションで共有するので読み取り専用にする
+@dataclass(slots=True, frozen=True)
 class QuizItem:
     id: str
     id_num: int
@@ -18,25 +44,40 @@ class QuizItem:
     cloze_en: str
     answer: str
     full_ja: str
+    norm_answer: str
+    full_en: str
 
 
 def normalize(s: str) -> str:
-    return str(s).strip().lower()
-
-
-def build_full_en(cloze_en: str, answer: str) -> str:
-    return cloze_en.replace("＿", "_").replace("____", answer)
-
-
-def load_items_from_xlsx(path: Path) -> List[QuizItem]:
-    if not path.exists():
-        raise FileNotFoundError("quiz.xlsx が見つかりません（app.pyと同じ階層に置いてください）")
-
-    wb = load_workbook(path, data_only=True)
-    ws = wb.worksheets[0]
-
-    header = next(ws.iter_rows(min_row=1, max_row=1, values_only=True))
-    headers = [str(v).strip() for v in header]
+    # 全角英数字・全角スペースは NFKC で半角になる
+    return unicodedata.normalize("NFKC", str(s)).translate(PUNCT_TABLE).strip().casefold()
+
+
+def read_rows(path: Path) -> Iterator[List[str]]:
+    # build_quiz.py で書き出した quiz.json が最新ならそちらを使う（Excelの解析を省略）
+    json_path = path.with_suffix(".json")
+    if json_path.exists():
+        data = json.loads(json_path.read_text(encoding="utf-8"))
+        if data.get("source_sha256") == hashlib.sha256(path.read_bytes()).hexdigest():
+            return iter(data["rows"])
+
+    # quiz.json が無い・古いときだけ Excel を直接読む
+    from build_quiz import read_xlsx_rows
+
+    return read_xlsx_rows(path)
+
+
+# 全セッションで1つの読み込み結果を共有する（共有物なので tuple にして書き換えを防ぐ）
+# mtime はキャッシュキー専用（Excelが更新されたら読み直し、古い結果は破棄する）
+@st.cache_resource(show_spinner=False, max_entries=1)
+def _load_items_cached(
+    path_str: str, mtime: float
+) -> Tuple[Tuple[QuizItem, ...], memoryview, Tuple[tuple, ...]]:
+    # 見出し行もデータ行も同じイテレータから順に取り出す
+    rows = read_rows(Path(path_str))
+    headers = next(rows, None)
+    if headers is None:
+        raise ValueError("Excelの1枚目のシートが空です")
     idx = {name: i for i, name in enumerate(headers)}
 
     required = ["id", "ja", "cloze_en", "answer", "full_ja"]
@@ -44,20 +85,23 @@ def load_items_from_xlsx(path: Path) -> List[QuizItem]:
     if missing:
         raise ValueError(f"Excelに必要な列がありません: {missing} / 現在: {headers}")
 
-    def get(row, col):
-        i = idx[col]
-        v = row[i] if i < len(row) else None
-        return "" if v is None else str(v).strip()
+    # 列位置は見出しで決まるので、必要な5列を1回で取り出す関数をここで作っておく
+    cols = [idx[c] for c in required]
+    pick = itemgetter(*cols)
+    width = max(cols) + 1
 
     items: List[QuizItem] = []
     bad = []
 
-    for row in ws.iter_rows(min_row=2, values_only=True):
-        _id = get(row, "id")
-        ja = get(row, "ja")
-        cloze_en = get(row, "cloze_en").replace("＿", "_")
-        answer = get(row, "answer")
-        full_ja = get(row, "full_ja")
+    for row in rows:
+        # Excelで行を消した後に残る空行は、列を見る前に読み飛ばす
+        if not any(row):
+            continue
+        if len(row) < width:
+            row = row + [""] * (width - len(row))
+
+        _id, ja, cloze_en, answer, full_ja = pick(row)
+        cloze_en = cloze_en.translate(FULLWIDTH_UNDERSCORE)
 
         try:
             id_num = int(_id)
@@ -65,7 +109,9 @@ def load_items_from_xlsx(path: Path) -> List[QuizItem]:
             bad.append((_id, "id が数字ではありません"))
             continue
 
-        if "____" not in cloze_en:
+        # 空欄の位置は一度だけ探し、全文の組み立てにもそのまま使う
+        pos = cloze_en.find(BLANK)
+        if pos < 0:
             bad.append((_id, "cloze_en に ____ がありません"))
             continue
         if not answer:
@@ -75,24 +121,48 @@ def load_items_from_xlsx(path: Path) -> List[QuizItem]:
             bad.append((_id, "full_ja が空です"))
             continue
 
-        items.append(QuizItem(_id, id_num, ja, cloze_en, answer, full_ja))
+        items.append(
+            QuizItem(
+                _id,
+                id_num,
+                ja,
+                cloze_en,
+                answer,
+                full_ja,
+                norm_answer=normalize(answer),
+                full_en=cloze_en[:pos] + answer + cloze_en[pos + len(BLANK) :],
+            )
+        )
+
+    # ID順に並べておき、出題範囲は二分探索で切り出す
+    # ids は int64 の連続バッファ（読み取り専用）で持ち、int オブジェクトを並べない
+    items.sort(key=lambda it: it.id_num)
+    ids = memoryview(array("q", [it.id_num for it in items])).toreadonly()
+    return tuple(items), ids, tuple(bad)
+
 
+def load_items_from_xlsx(path: Path) -> Tuple[Sequence[QuizItem], Sequence[int]]:
+    if not path.exists():
+        raise FileNotFoundError("quiz.xlsx が見つかりません（app.pyと同じ階層に置いてください）")
+
+    items, ids, bad = _load_items_cached(str(path), path.stat().st_mtime)
     st.session_state["bad_rows"] = bad
-    return items
+    return items, ids
 
 
-def init_quiz(min_id: int, max_id: int):
-    items = load_items_from_xlsx(XLSX_PATH)
-    pool = [it for it in items if min_id <= it.id_num <= max_id]
+def init_quiz(items: Sequence[QuizItem], ids: Sequence[int], min_id: int, max_id: int):
+    # items は ids（昇順）と同じ並び。範囲はコピーせず添字だけを抽選する
+    lo = bisect_left(ids, min_id)
+    hi = bisect_right(ids, max_id)
 
-    if len(pool) < QUESTIONS_PER_RUN:
+    if hi - lo < QUESTIONS_PER_RUN:
         raise ValueError(
-            f"指定範囲（ID {min_id}〜{max_id}）の有効問題が {len(pool)} 件です。"
+            f"指定範囲（ID {min_id}〜{max_id}）の有効問題が {hi - lo} 件です。"
             f"{QUESTIONS_PER_RUN} 件以上必要です。"
         )
 
-    quiz = random.sample(pool, QUESTIONS_PER_RUN)
-    st.session_state.quiz = [asdict(q) for q in quiz]
+    # QuizItem は出題中に書き換えないので、dict に変換せずそのまま持つ
+    st.session_state.quiz = [items[k] for k in random.sample(range(lo, hi), QUESTIONS_PER_RUN)]
     st.session_state.i = 0
     st.session_state.correct = 0
     st.session_state.wrong = 0
@@ -100,9 +170,6 @@ def init_quiz(min_id: int, max_id: int):
     st.session_state.phase = "question"
     st.session_state.last = None
 
-    # 次の描画で入力欄を空にするフラグ
-    st.session_state.clear_input_next = True
-
 
 # ===== UI =====
 st.set_page_config(page_title="英単語クイズ", page_icon="📝")
@@ -110,8 +177,6 @@ st.title("📝 英単語クイズ")
 
 if "phase" not in st.session_state:
     st.session_state.phase = "start"
-if "clear_input_next" not in st.session_state:
-    st.session_state.clear_input_next = False
 
 with st.sidebar:
     st.header("出題範囲指定（ID）")
@@ -140,7 +205,8 @@ if st.session_state.phase == "start":
     st.write(f"ID **{min_id}〜{max_id}** の範囲から **10問ランダム出題**します。")
     if st.button("▶️ スタート", type="primary"):
         try:
-            init_quiz(int(min_id), int(max_id))
+            items, ids = load_items_from_xlsx(XLSX_PATH)
+            init_quiz(items, ids, int(min_id), int(max_id))
             st.rerun()
         except Exception as e:
             st.error(str(e))
@@ -152,26 +218,26 @@ elif st.session_state.phase == "question":
     q = quiz[i]
 
     st.subheader(f"Q{i+1}/{QUESTIONS_PER_RUN}")
-    st.write(f"**日本語**：{q['ja']}")
-    st.write(f"**英文**：{q['cloze_en']}")
-
-    # 重要：入力クリアは「この画面に入る前」に行う（ウィジェット生成前）
-    if st.session_state.clear_input_next:
-        st.session_state["user_input_widget"] = ""
-        st.session_state.clear_input_next = False
+    st.write(f"**日本語**：{q.ja}")
+    st.write(f"**英文**：{q.cloze_en}")
 
-    user = st.text_input("空欄に入る語句（大小文字は無視）", key="user_input_widget")
+    # フォームにまとめて、送信/スキップを押すまで再実行しない
+    # （clear_on_submit で送信後の入力欄は自動で空になる。Enter は「送信」扱い）
+    with st.form("answer_form", clear_on_submit=True):
+        user = st.text_input("空欄に入る語句（大小文字は無視）", key="user_input_widget")
 
-    col1, col2 = st.columns(2)
+        col1, col2 = st.columns(2)
+        submitted = col1.form_submit_button("送信", type="primary")
+        skipped = col2.form_submit_button("スキップ")
 
-    if col1.button("送信", type="primary"):
-        if user.strip() == "":
+    if submitted or skipped:
+        if skipped or user.strip() == "":
             st.session_state.skipped += 1
             is_skip = True
             is_correct = False
         else:
             is_skip = False
-            is_correct = normalize(user) == normalize(q["answer"])
+            is_correct = normalize(user) == q.norm_answer
             if is_correct:
                 st.session_state.correct += 1
             else:
@@ -180,23 +246,10 @@ elif st.session_state.phase == "question":
         st.session_state.last = {
             "is_skip": is_skip,
             "is_correct": is_correct,
-            "user": user,
-            "answer": q["answer"],
-            "full_en": build_full_en(q["cloze_en"], q["answer"]),
-            "full_ja": q["full_ja"],
-        }
-        st.session_state.phase = "feedback"
-        st.rerun()
-
-    if col2.button("スキップ"):
-        st.session_state.skipped += 1
-        st.session_state.last = {
-            "is_skip": True,
-            "is_correct": False,
-            "user": "",
-            "answer": q["answer"],
-            "full_en": build_full_en(q["cloze_en"], q["answer"]),
-            "full_ja": q["full_ja"],
+            "user": "" if skipped else user,
+            "answer": q.answer,
+            "full_en": q.full_en,
+            "full_ja": q.full_ja,
         }
         st.session_state.phase = "feedback"
         st.rerun()
@@ -221,10 +274,6 @@ elif st.session_state.phase == "feedback":
     st.write(last["full_ja"])
 
     if st.button("次へ ▶️", type="primary"):
-        # ここではウィジェット値を直接触らない！
-        # 次の question 描画の直前にクリアするフラグを立てる
-        st.session_state.clear_input_next = True
-
         st.session_state.i += 1
         if st.session_state.i >= QUESTIONS_PER_RUN:
             st.session_state.phase = "done"
@@ -240,6 +289,5 @@ elif st.session_state.phase == "done":
     st.write(f"スキップ：{st.session_state.skipped}")
 
     if st.button("もう一回（別の10問）", type="primary"):
-        st.session_state.clear_input_next = True
         st.session_state.phase = "start"
         st.rerun()
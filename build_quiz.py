@@ -0,0 +1,131 @@
+"""quiz.xlsx を quiz.json に変換する（アプリ起動時に Excel を解析しないため）
+
+    python build_quiz.py
+
+quiz.xlsx を編集したら再実行してください。quiz.json が古い場合、
+アプリは quiz.xlsx を直接読み込みます。
+"""
+import hashlib
+import json
+import zipfile
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Iterator, List
+
+XLSX_PATH = Path("quiz.xlsx")
+
+# xlsx は zip の中の XML なので、必要な部分だけ標準ライブラリで読む
+NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+DOC_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PKG_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+
+def number_str(text: str) -> str:
+    # 数値セルは "1" や "1.0E+3" の形で入っている。整数値は "1" に揃える
+    try:
+        return str(int(text))
+    except ValueError:
+        f = float(text)
+        return str(int(f)) if f.is_integer() else str(f)
+
+
+def rich_text(el: ET.Element) -> str:
+    # 書式付き文字列は <r><t> に分かれている。ふりがな（<rPh>）は含めない
+    parts = el.findall(f"{NS}t") + el.findall(f"{NS}r/{NS}t")
+    return "".join(t.text or "" for t in parts)
+
+
+def first_sheet_path(z: zipfile.ZipFile) -> str:
+    wb = ET.fromstring(z.read("xl/workbook.xml"))
+    sheet = wb.find(f"{NS}sheets/{NS}sheet")
+    if sheet is None:
+        raise ValueError("Excelにシートがありません")
+
+    rid = sheet.get(f"{DOC_REL_NS}id")
+    rels = ET.fromstring(z.read("xl/_rels/workbook.xml.rels"))
+    for rel in rels.iter(f"{PKG_REL_NS}Relationship"):
+        if rel.get("Id") == rid:
+            target = rel.get("Target", "")
+            # "/xl/worksheets/..." の絶対指定と "worksheets/..." の相対指定がある
+            return target.lstrip("/") if target.startswith("/") else f"xl/{target}"
+    raise ValueError(f"シートの実体が見つかりません: {rid}")
+
+
+def read_shared_strings(z: zipfile.ZipFile) -> List[str]:
+    if "xl/sharedStrings.xml" not in z.namelist():
+        return []
+
+    shared = []
+    with z.open("xl/sharedStrings.xml") as f:
+        for _, el in ET.iterparse(f):
+            if el.tag == f"{NS}si":
+                shared.append(rich_text(el))
+                el.clear()
+    return shared
+
+
+def cell_str(c: ET.Element, shared: List[str]) -> str:
+    t = c.get("t")
+    if t == "inlineStr":
+        is_ = c.find(f"{NS}is")
+        return "" if is_ is None else rich_text(is_).strip()
+
+    v = c.find(f"{NS}v")
+    if v is None or v.text is None:
+        return ""
+    if t == "s":
+        return shared[int(v.text)].strip()
+    if t == "b":
+        return "True" if v.text == "1" else "False"
+    if t in ("str", "e", "d"):
+        return v.text.strip()
+    return number_str(v.text)
+
+
+def col_index(ref: str) -> int:
+    # "C12" -> 2
+    n = 0
+    for ch in ref:
+        if ch.isdigit():
+            break
+        n = n * 26 + ord(ch) - ord("A") + 1
+    return n - 1
+
+
+# セルはここで文字列化・strip 済みにしておく（アプリ側ではセル単位の変換をしない）
+# 見出し行も含めて1本のイテレータで先頭から1回だけ読む
+# 重要：行数を事前に数えない（openpyxl の ws.max_row / ws.max_column は全セルを
+# 走査するので大きなシートでは非常に遅い）。件数が必要なら読みながら数える
+def read_xlsx_rows(path: Path) -> Iterator[List[str]]:
+    with zipfile.ZipFile(path) as z:
+        shared = read_shared_strings(z)
+        with z.open(first_sheet_path(z)) as f:
+            for _, el in ET.iterparse(f):
+                if el.tag != f"{NS}row":
+                    continue
+
+                row: List[str] = []
+                for c in el.iter(f"{NS}c"):
+                    ref = c.get("r")
+                    # 空セルは XML に出てこないので、列位置まで "" で埋める
+                    i = col_index(ref) if ref else len(row)
+                    if i > len(row):
+                        row.extend([""] * (i - len(row)))
+                    row.append(cell_str(c, shared))
+                el.clear()
+                yield row
+
+
+def main():
+    rows = list(read_xlsx_rows(XLSX_PATH))
+    data = {
+        "source_sha256": hashlib.sha256(XLSX_PATH.read_bytes()).hexdigest(),
+        "rows": rows,
+    }
+    out = XLSX_PATH.with_suffix(".json")
+    out.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+    print(f"{out} に {len(rows) - 1} 行を書き出しました")
+
+
+if __name__ == "__main__":
+    main()